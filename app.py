@@ -3,6 +3,8 @@ import pandas as pd
 from src.data_loader import load_data
 from src.metrics import calculate_kpis, get_busiest_hour
 from src.charts import plot_transactions_per_hour
+from src.export import EXPORT_FORMATS, export_dataframe, export_filename, is_format_available
+from src.database import DEFAULT_DB_PATH
 
 # Configuración de página
 # Configuración de página
@@ -22,6 +24,23 @@ hide_st_style = """
             """
 st.markdown(hide_st_style, unsafe_allow_html=True)
 
+def download_button(data, label, base_name, fmt, key):
+    """
+    Muestra un botón de descarga para el DataFrame en el formato elegido.
+    El archivo se genera recién cuando el usuario hace clic.
+    """
+    if not is_format_available(fmt):
+        st.error(f"El formato {fmt} no está disponible: falta instalar su dependencia.")
+        return
+    st.download_button(
+        label=label,
+        data=lambda: export_dataframe(data, fmt),
+        file_name=export_filename(base_name, fmt),
+        mime=EXPORT_FORMATS[fmt]['mime'],
+        on_click="ignore",
+        key=key
+    )
+
 # --- SIDEBAR ---
 with st.sidebar:
     st.header("🎛 Configuración")
@@ -50,6 +69,19 @@ if uploaded_file is not None:
                 min_value=min_date,
                 max_value=max_date
             )
+
+            st.markdown("---")
+            st.subheader("💾 Exportar")
+            export_format = st.selectbox("Formato de descarga", list(EXPORT_FORMATS.keys()))
+
+            st.markdown("---")
+            st.subheader("🗄 Historial Local")
+            use_db = st.toggle(
+                "Guardar en base local (SQLite)",
+                value=False,
+                help="Acumula los reportes subidos en una base local para analizar el historial completo con SQL."
+            )
+            db_path = st.text_input("Archivo de base de datos", value=DEFAULT_DB_PATH, disabled=not use_db)
             
         # Aplicar filtros
         if len(date_range) == 2:
@@ -156,6 +188,7 @@ if uploaded_file is not None:
         with c4_2:
             st.write("🏆 **Top 5 Días (Volumen Total)**")
             st.dataframe(top_days, hide_index=True, use_container_width=True)
+            download_button(top_days, "⬇️ Descargar Top Días", "top_dias", export_format, key="dl_top_days")
 
         # Top Movimientos Individuales
         st.write("💎 **Top Transacciones Individuales**")
@@ -165,10 +198,12 @@ if uploaded_file is not None:
         with tab1:
             top_ingresos = get_top_movements(df, 'Ingreso', 5)
             st.dataframe(top_ingresos, hide_index=True, use_container_width=True)
+            download_button(top_ingresos, "⬇️ Descargar Top Ingresos", "top_ingresos", export_format, key="dl_top_ingresos")
             
         with tab2:
             top_egresos = get_top_movements(df, 'Egreso', 5)
             st.dataframe(top_egresos, hide_index=True, use_container_width=True)
+            download_button(top_egresos, "⬇️ Descargar Top Egresos", "top_egresos", export_format, key="dl_top_egresos")
 
         st.markdown("---")
         
@@ -235,6 +270,10 @@ if uploaded_file is not None:
                         )
                     else:
                         st.dataframe(alert['data'], use_container_width=True)
+                    download_button(
+                        alert['data'], "⬇️ Descargar Alerta", f"alerta_{alert['type']}",
+                        export_format, key=f"dl_alert_{alert['type']}"
+                    )
 
         # Tabla Completa con Buscador y Formato
         st.write("📋 **Tabla Detallada de Operaciones**")
@@ -256,6 +295,107 @@ if uploaded_file is not None:
             height=400
         )
 
+        export_cols = ['Fecha', 'Hora', 'TipoMovimiento', 'Origen', 'Destino', 'Monto', 'Mensaje']
+        download_button(df[export_cols], "⬇️ Descargar Operaciones Filtradas", "operaciones", export_format, key="dl_operaciones")
+
+        # --- HISTORIAL Y CONSULTAS AVANZADAS ---
+        if use_db:
+            st.markdown("---")
+            st.subheader("⚫ Historial y Consultas Avanzadas")
+
+            from src import database as db
+
+            conn = db.connect(db_path)
+            try:
+                # Sincronizar solo una vez por archivo subido
+                sync_key = (db_path, uploaded_file.name, uploaded_file.size)
+                if st.session_state.get('db_synced') != sync_key:
+                    inserted = db.sync_transactions(conn, df_raw)
+                    st.session_state['db_synced'] = sync_key
+                    st.toast(f"🗄 {inserted} operaciones nuevas guardadas en el historial.")
+
+                hist_min, hist_max = db.get_date_bounds(conn)
+                hist_range = st.date_input(
+                    "Rango del Historial",
+                    value=(hist_min, hist_max),
+                    min_value=hist_min,
+                    max_value=hist_max,
+                    key="hist_range"
+                )
+                hist_start, hist_end = hist_range if len(hist_range) == 2 else (hist_min, hist_max)
+
+                hist_kpis = db.calculate_kpis(conn, hist_start, hist_end)
+                hist_hour, hist_hour_count = db.get_busiest_hour(conn, hist_start, hist_end)
+
+                h1, h2, h3, h4 = st.columns(4)
+                h1.metric("Total Recibido", f"S/ {hist_kpis['total_recibido']:,.2f}")
+                h2.metric("Total Enviado", f"S/ {hist_kpis['total_enviado']:,.2f}")
+                h3.metric("Balance Neto", f"S/ {hist_kpis['balance']:,.2f}")
+                h4.metric("Transacciones", hist_kpis['count_tx'])
+                hist_day, hist_day_count = db.get_busiest_day(conn, hist_start, hist_end)
+                hist_amounts = db.get_amount_stats(conn, hist_start, hist_end)
+
+                st.info(
+                    f"⏰ **Hora Pico del Historial**: {hist_hour}:00 hrs ({hist_hour_count} txs) · "
+                    f"📅 **Día con más movimiento**: {hist_day} ({hist_day_count} transacciones)"
+                )
+
+                a1, a2, a3 = st.columns(3)
+                a1.metric("💵 Mayor Ingreso", f"S/ {hist_amounts['max_recibido']:,.2f}")
+                a2.metric("💸 Mayor Egreso", f"S/ {hist_amounts['max_enviado']:,.2f}")
+                a3.metric("📊 Promedio x TX", f"S/ {hist_amounts['avg_monto']:,.2f}")
+
+                c6_1, c6_2 = st.columns(2)
+                with c6_1:
+                    st.write("🏆 **Top 5 Días del Historial**")
+                    st.dataframe(db.get_top_days_by_amount(conn, 5, hist_start, hist_end), hide_index=True, use_container_width=True)
+                with c6_2:
+                    st.write("💎 **Mayores Ingresos del Historial**")
+                    st.dataframe(db.get_top_movements(conn, 'Ingreso', 5, hist_start, hist_end), hide_index=True, use_container_width=True)
+
+                hist_ratios = db.calculate_ratios(conn, hist_start, hist_end)
+                r1, r2, r3 = st.columns(3)
+                r1.metric("Ingresos", f"{hist_ratios['pct_ingreso']:.1f}%")
+                r2.metric("Egresos", f"{hist_ratios['pct_egreso']:.1f}%")
+                r3.metric("Ratio Gasto/Ingreso", f"{hist_ratios['ratio']:.2f}", help="Por cada sol que ingresa, ¿cuántos salen?")
+
+                # Mismo umbral que el Centro de Alertas
+                hist_alerts = db.get_alerts(conn, user_threshold, hist_start, hist_end)
+                if not hist_alerts:
+                    st.success("✅ No se detectaron anomalías en el historial.")
+                for alert in hist_alerts:
+                    with st.expander(f"{alert['title']} ({alert['message']})"):
+                        st.dataframe(alert['data'], use_container_width=True)
+                        download_button(
+                            alert['data'], "⬇️ Descargar Alerta", f"historial_alerta_{alert['type']}",
+                            export_format, key=f"dl_hist_alert_{alert['type']}"
+                        )
+            finally:
+                conn.close()
+
+            # Consulta libre (conexión de solo lectura)
+            with st.expander("🧮 Consulta SQL Avanzada"):
+                st.markdown(
+                    "Tabla `transacciones`: `fecha_operacion`, `fecha`, `hora`, `dia_semana`, `rango_horario`, "
+                    "`tipo_transaccion`, `tipo_movimiento`, `origen`, `destino`, `monto`, `mensaje`."
+                )
+                sql = st.text_area(
+                    "Consulta",
+                    value="SELECT substr(fecha, 1, 7) AS mes, tipo_movimiento, SUM(monto) AS total\n"
+                          "FROM transacciones\nGROUP BY mes, tipo_movimiento\nORDER BY mes",
+                    height=150
+                )
+                if st.button("▶️ Ejecutar", key="run_sql"):
+                    try:
+                        result = db.run_query(db_path, sql)
+                    except Exception as e:
+                        st.error(f"Error en la consulta: {e}")
+                    else:
+                        if len(result) >= db.MAX_QUERY_ROWS:
+                            st.warning(f"Se muestran solo las primeras {db.MAX_QUERY_ROWS} filas.")
+                        st.dataframe(result, use_container_width=True)
+                        download_button(result, "⬇️ Descargar Resultado", "consulta", export_format, key="dl_consulta")
+
     else:
         st.error("No se pudieron procesar los datos del archivo.")
 else:
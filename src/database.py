@@ -0,0 +1,388 @@
+import sqlite3
+import time
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_DB_PATH = 'yape_historial.db'
+
+# Filas por lote al insertar y máximo de filas devueltas por una consulta libre
+INSERT_BATCH_SIZE = 10_000
+MAX_QUERY_ROWS = 10_000
+
+# Tiempo máximo (segundos) de una consulta libre y cada cuántas instrucciones se revisa
+QUERY_TIMEOUT_SECONDS = 10
+PROGRESS_HANDLER_STEPS = 10_000
+
+# Acciones permitidas en una consulta libre: solo lectura (sin ATTACH, VACUUM INTO, PRAGMA...)
+ALLOWED_QUERY_ACTIONS = {sqlite3.SQLITE_READ, sqlite3.SQLITE_SELECT, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+# Umbral de frecuencia de `metrics.get_alerts` (transacciones por hora)
+PEAK_THRESHOLD = 5
+
+# Columnas del DataFrame normalizado -> columnas de la tabla
+COLUMN_MAP = {
+    'Fecha de operación': 'fecha_operacion',
+    'Fecha': 'fecha',
+    'Hora': 'hora',
+    'DiaSemana': 'dia_semana',
+    'RangoHorario': 'rango_horario',
+    'Tipo de Transacción': 'tipo_transaccion',
+    'TipoMovimiento': 'tipo_movimiento',
+    'Origen': 'origen',
+    'Destino': 'destino',
+    'Monto': 'monto',
+    'Mensaje': 'mensaje',
+}
+
+# Columnas que identifican una operación; `ocurrencia` distingue repeticiones idénticas
+KEY_COLUMNS = ['fecha_operacion', 'tipo_transaccion', 'origen', 'destino', 'monto', 'mensaje']
+
+TEXT_COLUMNS = ['dia_semana', 'rango_horario', 'tipo_transaccion', 'tipo_movimiento', 'origen', 'destino', 'mensaje']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transacciones (
+    id INTEGER PRIMARY KEY,
+    fecha_operacion TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    hora INTEGER NOT NULL,
+    dia_semana TEXT NOT NULL DEFAULT '',
+    rango_horario TEXT NOT NULL DEFAULT '',
+    tipo_transaccion TEXT NOT NULL DEFAULT '',
+    tipo_movimiento TEXT NOT NULL DEFAULT '',
+    origen TEXT NOT NULL DEFAULT '',
+    destino TEXT NOT NULL DEFAULT '',
+    monto REAL,
+    mensaje TEXT NOT NULL DEFAULT '',
+    ocurrencia INTEGER NOT NULL DEFAULT 0
+);
+-- IFNULL: SQLite considera distintos los NULL dentro de un índice único
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tx_operacion ON transacciones (
+    fecha_operacion, tipo_transaccion, origen, destino, IFNULL(monto, ''), mensaje, ocurrencia
+);
+CREATE INDEX IF NOT EXISTS idx_tx_fecha_operacion ON transacciones (fecha_operacion);
+CREATE INDEX IF NOT EXISTS idx_tx_fecha_hora ON transacciones (fecha, hora);
+CREATE INDEX IF NOT EXISTS idx_tx_tipo_monto ON transacciones (tipo_movimiento, monto);
+CREATE INDEX IF NOT EXISTS idx_tx_origen ON transacciones (origen);
+CREATE INDEX IF NOT EXISTS idx_tx_destino ON transacciones (destino);
+"""
+
+
+def connect(db_path=DEFAULT_DB_PATH, read_only=False):
+    """
+    Abre la base SQLite local y crea el esquema si no existe.
+    Con `read_only=True` la conexión no permite modificar datos.
+    """
+    if read_only:
+        # as_uri escapa caracteres como '?' o '#' que cambiarían el archivo abierto
+        uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True)
+    else:
+        conn = sqlite3.connect(db_path)
+        conn.executescript(SCHEMA)
+    return conn
+
+
+def sync_transactions(conn, df):
+    """
+    Guarda las transacciones normalizadas de `load_data` en la base.
+    Las operaciones ya registradas se ignoran, así que se pueden subir
+    reportes que se solapan para ir armando el historial. Las operaciones
+    idénticas dentro de un mismo reporte se conservan gracias a `ocurrencia`.
+    Retorna la cantidad de filas nuevas.
+    """
+    if df is None or df.empty:
+        return 0
+
+    cols = [c for c in COLUMN_MAP if c in df.columns]
+    data = df[cols].rename(columns=COLUMN_MAP)
+
+    data['fecha_operacion'] = pd.to_datetime(data['fecha_operacion']).dt.strftime('%Y-%m-%d %H:%M:%S')
+    data['fecha'] = pd.to_datetime(data['fecha']).dt.strftime('%Y-%m-%d')
+    for col in TEXT_COLUMNS:
+        if col in data.columns:
+            data[col] = data[col].fillna('').astype(str)
+    data['monto'] = data['monto'].astype(float)
+    data['ocurrencia'] = data.groupby([c for c in KEY_COLUMNS if c in data.columns], dropna=False).cumcount()
+
+    # Convertir NaN a None para que SQLite guarde NULL
+    data = data.astype(object).where(data.notna(), None)
+
+    columns = list(data.columns)
+    placeholders = ', '.join('?' for _ in columns)
+    sql = f"INSERT OR IGNORE INTO transacciones ({', '.join(columns)}) VALUES ({placeholders})"
+
+    before = conn.total_changes
+    with conn:
+        for start in range(0, len(data), INSERT_BATCH_SIZE):
+            batch = data.iloc[start:start + INSERT_BATCH_SIZE]
+            conn.executemany(sql, batch.itertuples(index=False, name=None))
+    return conn.total_changes - before
+
+
+def _date_filter(start_date=None, end_date=None):
+    """
+    Construye la cláusula WHERE por rango de fechas y sus parámetros.
+    """
+    clauses, params = [], []
+    if start_date is not None:
+        clauses.append("fecha >= ?")
+        params.append(str(start_date))
+    if end_date is not None:
+        clauses.append("fecha <= ?")
+        params.append(str(end_date))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def _and(where, condition):
+    """
+    Agrega una condición a una cláusula WHERE existente (o la crea).
+    """
+    return f"{where} AND {condition}" if where else f"WHERE {condition}"
+
+
+def get_date_bounds(conn):
+    """
+    Retorna la primera y última fecha registradas (o None si la base está vacía).
+    """
+    row = conn.execute("SELECT MIN(fecha), MAX(fecha) FROM transacciones").fetchone()
+    if row[0] is None:
+        return None, None
+    return pd.to_datetime(row[0]).date(), pd.to_datetime(row[1]).date()
+
+
+def calculate_kpis(conn, start_date=None, end_date=None):
+    """
+    Versión SQL de `metrics.calculate_kpis`.
+    """
+    where, params = _date_filter(start_date, end_date)
+    total_recibido, total_enviado, count_tx = conn.execute(f"""
+        SELECT
+            COALESCE(SUM(CASE WHEN tipo_movimiento = 'Ingreso' THEN monto END), 0),
+            COALESCE(SUM(CASE WHEN tipo_movimiento = 'Egreso' THEN monto END), 0),
+            COUNT(*)
+        FROM transacciones {where}
+    """, params).fetchone()
+
+    return {
+        'total_recibido': total_recibido,
+        'total_enviado': total_enviado,
+        'balance': total_recibido - total_enviado,
+        'count_tx': count_tx
+    }
+
+
+def get_busiest_hour(conn, start_date=None, end_date=None):
+    """
+    Versión SQL de `metrics.get_busiest_hour`.
+    """
+    where, params = _date_filter(start_date, end_date)
+    row = conn.execute(f"""
+        SELECT hora, COUNT(*) AS n FROM transacciones {where}
+        GROUP BY hora ORDER BY n DESC, hora LIMIT 1
+    """, params).fetchone()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+def get_busiest_day(conn, start_date=None, end_date=None):
+    """
+    Versión SQL de `metrics.get_busiest_day`.
+    """
+    where, params = _date_filter(start_date, end_date)
+    row = conn.execute(f"""
+        SELECT fecha, COUNT(*) AS n FROM transacciones {where}
+        GROUP BY fecha ORDER BY n DESC, fecha LIMIT 1
+    """, params).fetchone()
+    if not row:
+        return "N/A", 0
+    return pd.to_datetime(row[0]).date(), row[1]
+
+
+def get_amount_stats(conn, start_date=None, end_date=None):
+    """
+    Versión SQL de `metrics.get_amount_stats`.
+    """
+    where, params = _date_filter(start_date, end_date)
+    max_recibido, max_enviado, avg_monto = conn.execute(f"""
+        SELECT
+            MAX(CASE WHEN tipo_movimiento = 'Ingreso' THEN monto END),
+            MAX(CASE WHEN tipo_movimiento = 'Egreso' THEN monto END),
+            AVG(monto)
+        FROM transacciones {where}
+    """, params).fetchone()
+
+    return {
+        'max_recibido': max_recibido or 0,
+        'max_enviado': max_enviado or 0,
+        'avg_monto': avg_monto or 0
+    }
+
+
+def get_top_days_by_amount(conn, n=5, start_date=None, end_date=None):
+    """
+    Versión SQL de `metrics.get_top_days_by_amount`.
+    """
+    where, params = _date_filter(start_date, end_date)
+    top = pd.read_sql_query(f"""
+        SELECT fecha AS "Fecha", COALESCE(SUM(monto), 0) AS "Monto Total"
+        FROM transacciones {where}
+        GROUP BY fecha ORDER BY "Monto Total" DESC LIMIT ?
+    """, conn, params=params + [n])
+    if top.empty:
+        return pd.DataFrame()
+    top['Fecha'] = pd.to_datetime(top['Fecha']).dt.date
+    return top
+
+
+def get_top_movements(conn, tipo='Ingreso', n=5, start_date=None, end_date=None):
+    """
+    Versión SQL de `metrics.get_top_movements`.
+    """
+    where, params = _date_filter(start_date, end_date)
+    where = _and(where, "tipo_movimiento = ?")
+    top = pd.read_sql_query(f"""
+        SELECT fecha AS "Fecha", hora AS "Hora", origen AS "Origen",
+               destino AS "Destino", monto AS "Monto"
+        FROM transacciones {where}
+        ORDER BY monto DESC LIMIT ?
+    """, conn, params=params + [tipo, n])
+    if top.empty:
+        return pd.DataFrame()
+    top['Fecha'] = pd.to_datetime(top['Fecha']).dt.date
+    return top
+
+
+def calculate_ratios(conn, start_date=None, end_date=None):
+    """
+    Versión SQL de `metrics.calculate_ratios`.
+    """
+    kpis = calculate_kpis(conn, start_date, end_date)
+    total_recibido = kpis['total_recibido']
+    total_enviado = kpis['total_enviado']
+    total_movido = total_recibido + total_enviado
+
+    if total_movido == 0:
+        pct_ingreso = 0
+        pct_egreso = 0
+    else:
+        pct_ingreso = (total_recibido / total_movido) * 100
+        pct_egreso = (total_enviado / total_movido) * 100
+
+    ratio_egreso_ingreso = total_enviado / total_recibido if total_recibido > 0 else 0
+
+    return {
+        'pct_ingreso': pct_ingreso,
+        'pct_egreso': pct_egreso,
+        'ratio': ratio_egreso_ingreso,
+        'total_movido': total_movido
+    }
+
+
+def _amount_quantile(conn, q, where, params):
+    """
+    Percentil de montos con interpolación lineal (igual que `Series.quantile`).
+    Retorna None si no hay montos.
+    """
+    where = _and(where, "monto IS NOT NULL")
+    n = conn.execute(f"SELECT COUNT(*) FROM transacciones {where}", params).fetchone()[0]
+    if n == 0:
+        return None
+    pos = (n - 1) * q
+    lower = int(pos)
+    values = [row[0] for row in conn.execute(
+        f"SELECT monto FROM transacciones {where} ORDER BY monto LIMIT 2 OFFSET ?",
+        params + [lower]
+    )]
+    if len(values) == 1:
+        return values[0]
+    return values[0] + (values[1] - values[0]) * (pos - lower)
+
+
+def get_alerts(conn, custom_threshold=None, start_date=None, end_date=None):
+    """
+    Versión SQL de `metrics.get_alerts`.
+    """
+    alerts = []
+    where, params = _date_filter(start_date, end_date)
+
+    if conn.execute(f"SELECT COUNT(*) FROM transacciones {where}", params).fetchone()[0] == 0:
+        return alerts
+
+    # 1. Alerta de Montos Altos (Outliers)
+    if custom_threshold is not None:
+        threshold_high = custom_threshold
+    else:
+        # Percentil 95 como umbral dinámico, con un piso mínimo de 50 soles
+        threshold_high = _amount_quantile(conn, 0.95, where, params)
+        if threshold_high is not None and threshold_high < 50:
+            threshold_high = 50
+
+    if threshold_high is not None:
+        high_tx = pd.read_sql_query(f"""
+            SELECT fecha AS "Fecha", hora AS "Hora", tipo_movimiento AS "TipoMovimiento",
+                   monto AS "Monto", origen AS "Origen", destino AS "Destino"
+            FROM transacciones {_and(where, "monto > ?")}
+            ORDER BY monto DESC
+        """, conn, params=params + [threshold_high])
+
+        if not high_tx.empty:
+            high_tx['Fecha'] = pd.to_datetime(high_tx['Fecha']).dt.date
+            alerts.append({
+                'type': 'high_amount',
+                'title': '🚨 Operaciones de Alto Valor',
+                'message': f"Se detectaron {len(high_tx)} operaciones por encima de S/ {threshold_high:.2f}",
+                'data': high_tx
+            })
+
+    # 2. Alerta de Frecuencia Inusual (Picos por Hora)
+    abnormal_peaks = pd.read_sql_query(f"""
+        SELECT fecha AS "Fecha", hora AS "Hora", COUNT(*) AS "count"
+        FROM transacciones {where}
+        GROUP BY fecha, hora HAVING COUNT(*) > ?
+        ORDER BY "count" DESC
+    """, conn, params=params + [PEAK_THRESHOLD])
+
+    if not abnormal_peaks.empty:
+        abnormal_peaks['Fecha'] = pd.to_datetime(abnormal_peaks['Fecha']).dt.date
+        alerts.append({
+            'type': 'frequency_peak',
+            'title': '⚠️ Picos de Actividad Inusual',
+            'message': f"Hubo {len(abnormal_peaks)} momentos con alto tráfico (> {PEAK_THRESHOLD} transacciones/hora).",
+            'data': abnormal_peaks
+        })
+
+    return alerts
+
+
+def _authorize_read_only(action, *args):
+    """
+    Autorizador de consultas libres: rechaza todo lo que no sea lectura.
+    """
+    return sqlite3.SQLITE_OK if action in ALLOWED_QUERY_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def run_query(db_path, sql, max_rows=MAX_QUERY_ROWS, timeout=QUERY_TIMEOUT_SECONDS):
+    """
+    Ejecuta una consulta libre sobre una conexión de solo lectura.
+    Retorna un DataFrame con como máximo `max_rows` filas. Si la consulta
+    supera `timeout` segundos se interrumpe con `sqlite3.OperationalError`;
+    si intenta escribir o adjuntar archivos se rechaza con `sqlite3.DatabaseError`.
+    """
+    conn = connect(db_path, read_only=True)
+    conn.set_authorizer(_authorize_read_only)
+    deadline = time.monotonic() + timeout
+    # Un valor distinto de cero aborta la consulta en curso
+    conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_HANDLER_STEPS)
+    try:
+        cursor = conn.execute(sql)
+        if cursor.description is None:
+            return pd.DataFrame()
+        columns = [d[0] for d in cursor.description]
+        return pd.DataFrame(cursor.fetchmany(max_rows), columns=columns)
+    except sqlite3.OperationalError as e:
+        if time.monotonic() > deadline:
+            raise sqlite3.OperationalError(f"La consulta superó el tiempo límite de {timeout} s.") from e
+        raise
+    finally:
+        conn.close()
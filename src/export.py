@@ -0,0 +1,168 @@
+import importlib.util
+import io
+
+import numpy as np
+import pandas as pd
+
+# Cantidad de filas que se procesan por bloque al escribir un archivo
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Tipos que pyarrow infiere sin problema en columnas de tipo object
+PARQUET_SAFE_OBJECT_TYPES = {'string', 'bytes', 'boolean', 'integer', 'floating', 'decimal', 'date', 'datetime', 'empty'}
+
+# Límite de filas por hoja en Excel (incluye la fila de encabezado)
+XLSX_MAX_ROWS = 1_048_576
+
+EXPORT_FORMATS = {
+    'CSV': {'extension': 'csv', 'mime': 'text/csv'},
+    'Parquet': {'extension': 'parquet', 'mime': 'application/vnd.apache.parquet'},
+    'Excel (XLSX)': {
+        'extension': 'xlsx',
+        'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    },
+}
+
+
+def iter_chunks(df, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Recorre el DataFrame en bloques de `chunk_size` filas sin copiarlo completo.
+    """
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def write_csv(df, fileobj, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Escribe el DataFrame como CSV (UTF-8 con BOM para que Excel respete tildes),
+    bloque por bloque sobre un archivo binario.
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='', write_through=True)
+    try:
+        df.head(0).to_csv(text, index=False, lineterminator='\n')
+        for chunk in iter_chunks(df, chunk_size):
+            chunk.to_csv(text, header=False, index=False, lineterminator='\n')
+        text.flush()
+    finally:
+        # Soltar el archivo binario sin cerrarlo
+        text.detach()
+
+
+def write_parquet(df, fileobj, chunk_size=DEFAULT_CHUNK_SIZE, compression='zstd'):
+    """
+    Escribe el DataFrame como Parquet comprimido, un row group por bloque.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Se requiere 'pyarrow' para exportar en formato Parquet.") from e
+
+    # Columnas con tipos mezclados (ej. Mensaje con números y textos) se guardan como texto
+    mixed_cols = [
+        col for col in df.columns
+        if df[col].dtype == 'object'
+        and pd.api.types.infer_dtype(df[col], skipna=True) not in PARQUET_SAFE_OBJECT_TYPES
+    ]
+    if mixed_cols:
+        df = df.assign(**{col: df[col].where(df[col].isna(), df[col].astype(str)) for col in mixed_cols})
+
+    # Esquema único para todos los bloques (evita tipos distintos entre bloques)
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    with pq.ParquetWriter(fileobj, schema, compression=compression) as writer:
+        for chunk in iter_chunks(df, chunk_size):
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            writer.write_table(table)
+
+
+def _to_excel_value(ws, value):
+    """
+    Convierte un valor de pandas/numpy a un tipo que openpyxl sepa escribir.
+    Los textos se escriben siempre como texto literal: Mensaje, Origen y Destino
+    los escribe la otra persona, y un "=..." no debe abrirse como fórmula.
+    """
+    from openpyxl.cell import WriteOnlyCell
+
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, str):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.data_type = 's'
+        return cell
+    return value
+
+
+def write_xlsx(df, fileobj, chunk_size=DEFAULT_CHUNK_SIZE, sheet_name='Datos'):
+    """
+    Escribe el DataFrame como XLSX usando el modo write-only de openpyxl.
+    Si las filas superan el límite de Excel se continúa en hojas adicionales.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    header = [str(col) for col in df.columns]
+    max_data_rows = XLSX_MAX_ROWS - 1
+
+    ws = None
+    sheet_count = 0
+    rows_in_sheet = max_data_rows
+
+    for chunk in iter_chunks(df, chunk_size):
+        for row in chunk.itertuples(index=False, name=None):
+            if rows_in_sheet >= max_data_rows:
+                sheet_count += 1
+                title = sheet_name if sheet_count == 1 else f"{sheet_name} {sheet_count}"
+                ws = wb.create_sheet(title=title)
+                ws.append(header)
+                rows_in_sheet = 0
+            ws.append([_to_excel_value(ws, v) for v in row])
+            rows_in_sheet += 1
+
+    # Un DataFrame vacío igual genera una hoja con encabezados
+    if ws is None:
+        ws = wb.create_sheet(title=sheet_name)
+        ws.append(header)
+
+    wb.save(fileobj)
+
+
+WRITERS = {
+    'CSV': write_csv,
+    'Parquet': write_parquet,
+    'Excel (XLSX)': write_xlsx,
+}
+
+
+def is_format_available(fmt):
+    """
+    Indica si las dependencias opcionales del formato están instaladas.
+    """
+    if fmt == 'Parquet':
+        return importlib.util.find_spec('pyarrow') is not None
+    return fmt in WRITERS
+
+
+def export_dataframe(df, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Genera el archivo de exportación en memoria y lo retorna posicionado al inicio.
+    Pensado para usarse como callable diferido de `st.download_button`, de modo
+    que el archivo solo se construya cuando el usuario hace clic.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato de exportación no soportado: {fmt}")
+
+    buffer = io.BytesIO()
+    WRITERS[fmt](df, buffer, chunk_size=chunk_size)
+    buffer.seek(0)
+    return buffer
+
+
+def export_filename(base_name, fmt):
+    """
+    Retorna el nombre de archivo con la extensión del formato elegido.
+    """
+    return f"{base_name}.{EXPORT_FORMATS[fmt]['extension']}"
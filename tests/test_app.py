@@ -0,0 +1,68 @@
+import io
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = str(Path(__file__).resolve().parent.parent / 'app.py')
+
+
+def build_report():
+    """
+    Arma un Excel con el formato del reporte de Yape (título antes del encabezado).
+    """
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    rows = []
+    for i in range(40):
+        tipo = 'Te yapearon' if i % 2 == 0 else 'Yapeaste'
+        fecha = start + timedelta(days=i % 7, hours=i % 5)
+        rows.append([tipo, 'Ana', 'Luis', 10 + i * 7.5, 'almuerzo' if i % 3 else 123,
+                     fecha.strftime('%d/%m/%Y %H:%M:%S')])
+    # Un yape repetido en el mismo segundo
+    rows.append(list(rows[-1]))
+
+    header = ['Tipo de Transacción', 'Origen', 'Destino', 'Monto', 'Mensaje', 'Fecha de operación']
+    body = pd.DataFrame(rows, columns=header)
+
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        pd.DataFrame([['Reporte de movimientos']]).to_excel(writer, index=False, header=False)
+        body.to_excel(writer, index=False, startrow=2)
+    buffer.seek(0)
+    buffer.name = 'reporte.xlsx'
+    buffer.size = len(buffer.getvalue())
+    return buffer
+
+
+@pytest.fixture
+def uploaded_report():
+    with mock.patch('streamlit.file_uploader', return_value=build_report()):
+        yield
+
+
+def test_app_renders_without_upload():
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    assert not at.exception
+
+
+def test_app_renders_full_dashboard(uploaded_report):
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    assert not at.exception
+    subheaders = [s.value for s in at.subheader]
+    assert "🔴 Centro de Alertas y Control" in subheaders
+
+
+def test_app_renders_history_panel(uploaded_report, tmp_path, monkeypatch):
+    # La base por defecto es relativa: que se cree dentro de tmp_path
+    monkeypatch.chdir(tmp_path)
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    at.toggle[0].set_value(True).run()
+    assert not at.exception
+    assert "⚫ Historial y Consultas Avanzadas" in [s.value for s in at.subheader]
+    # El historial debe coincidir con el dashboard en pandas (incluye el yape repetido)
+    counts = [m.value for m in at.metric if m.label == 'Transacciones']
+    assert counts[0] == counts[1] == '41'
+    assert [p.name for p in tmp_path.iterdir()] == ['yape_historial.db']
@@ -0,0 +1,116 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src import database as db
+from src import metrics
+
+
+@pytest.fixture
+def df():
+    fechas = pd.to_datetime(['2024-01-01 10:00:00', '2024-01-01 10:00:00', '2024-01-02 18:30:00', '2024-01-03 08:00:00'])
+    return pd.DataFrame({
+        'Fecha de operación': fechas,
+        'Fecha': fechas.date,
+        'Hora': fechas.hour,
+        'Tipo de Transacción': ['Yapeaste', 'Yapeaste', 'Te yapearon', 'Yapeaste'],
+        'TipoMovimiento': ['Egreso', 'Egreso', 'Ingreso', 'Egreso'],
+        'Origen': ['Ana', 'Ana', 'Luis', 'Ana'],
+        'Destino': ['Luis', 'Luis', 'Ana', 'Luis'],
+        'Monto': [10.0, 10.0, 25.0, None],
+        'Mensaje': [None, None, 'pago', None],
+    })
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'historial.db')
+
+
+def test_sync_keeps_repeats_and_ignores_reuploads(df, db_path):
+    conn = db.connect(db_path)
+    assert db.sync_transactions(conn, df) == 4
+    assert db.sync_transactions(conn, df) == 0
+    # Un reporte que se solapa solo agrega lo nuevo
+    assert db.sync_transactions(conn, pd.concat([df, df.head(1)])) == 1
+    conn.close()
+
+
+def test_sql_metrics_match_pandas(df, db_path):
+    conn = db.connect(db_path)
+    db.sync_transactions(conn, df)
+    assert db.calculate_kpis(conn) == metrics.calculate_kpis(df)
+    assert db.get_busiest_hour(conn) == metrics.get_busiest_hour(df)
+    assert db.get_busiest_day(conn) == metrics.get_busiest_day(df)
+    assert db.get_amount_stats(conn) == metrics.get_amount_stats(df)
+    assert db.calculate_ratios(conn) == metrics.calculate_ratios(df)
+    pd.testing.assert_frame_equal(db.get_top_days_by_amount(conn), metrics.get_top_days_by_amount(df), check_dtype=False)
+    for tipo in ['Ingreso', 'Egreso']:
+        pd.testing.assert_frame_equal(
+            db.get_top_movements(conn, tipo),
+            metrics.get_top_movements(df, tipo).reset_index(drop=True),
+            check_dtype=False
+        )
+    conn.close()
+
+
+@pytest.mark.parametrize('threshold', [None, 5])
+def test_sql_alerts_match_pandas(df, db_path, threshold):
+    # Repetir el reporte para generar un pico de más de 5 operaciones en una hora
+    df = pd.concat([df] * 4, ignore_index=True)
+    conn = db.connect(db_path)
+    db.sync_transactions(conn, df)
+    expected = metrics.get_alerts(df, custom_threshold=threshold)
+    result = db.get_alerts(conn, custom_threshold=threshold)
+    conn.close()
+
+    assert [a['type'] for a in result] == [a['type'] for a in expected]
+    for got, want in zip(result, expected):
+        assert got['message'] == want['message']
+        pd.testing.assert_frame_equal(got['data'], want['data'].reset_index(drop=True), check_dtype=False)
+
+
+def test_sql_quantile_matches_pandas(df, db_path):
+    df = df.assign(Monto=[10.0, 120.0, 300.0, None])
+    conn = db.connect(db_path)
+    db.sync_transactions(conn, df)
+    assert db._amount_quantile(conn, 0.95, '', []) == pytest.approx(df['Monto'].quantile(0.95))
+    conn.close()
+
+
+def test_read_only_uri_is_escaped(tmp_path):
+    path = tmp_path / 'x?y.db'
+    db.connect(str(path)).close()
+    conn = db.connect(str(path), read_only=True)
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("CREATE TABLE z (a)")
+    conn.close()
+    assert not (tmp_path / 'x').exists()
+
+
+def test_run_query_times_out(db_path):
+    db.connect(db_path).close()
+    sql = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+    with pytest.raises(sqlite3.OperationalError, match="tiempo límite"):
+        db.run_query(db_path, sql, timeout=0.2)
+
+
+@pytest.mark.parametrize('sql', [
+    "VACUUM INTO '{path}'",
+    "ATTACH '{path}' AS n",
+])
+def test_run_query_rejects_file_writes(db_path, tmp_path, sql):
+    db.connect(db_path).close()
+    target = tmp_path / 'copia.db'
+    with pytest.raises(sqlite3.DatabaseError):
+        db.run_query(db_path, sql.format(path=target))
+    assert not target.exists()
+
+
+def test_run_query_allows_reads(df, db_path):
+    conn = db.connect(db_path)
+    db.sync_transactions(conn, df)
+    conn.close()
+    sql = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 3) SELECT count(*) AS n FROM c, transacciones"
+    assert db.run_query(db_path, sql)['n'].tolist() == [12]
@@ -0,0 +1,64 @@
+import io
+from datetime import date
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from src.export import EXPORT_FORMATS, export_dataframe
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'Fecha': [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)],
+        'Hora': [8, 9, 10],
+        'Monto': [1.5, None, 20.0],
+        'Mensaje': ['almuerzo', 123, None],
+    })
+
+
+def test_csv_uses_single_line_ending(df):
+    data = export_dataframe(df, 'CSV', chunk_size=2).read()
+    assert b'\r' not in data
+    lines = data.decode('utf-8-sig').splitlines()
+    assert lines[0] == 'Fecha,Hora,Monto,Mensaje'
+    assert len(lines) == 4
+
+
+def test_parquet_handles_mixed_object_columns(df):
+    result = pd.read_parquet(export_dataframe(df, 'Parquet', chunk_size=2))
+    assert len(result) == 3
+    assert result['Mensaje'].tolist()[:2] == ['almuerzo', '123']
+
+
+def test_xlsx_roundtrip(df):
+    ws = load_workbook(export_dataframe(df, 'Excel (XLSX)', chunk_size=2)).active
+    rows = list(ws.values)
+    assert rows[0] == ('Fecha', 'Hora', 'Monto', 'Mensaje')
+    assert len(rows) == 4
+
+
+@pytest.mark.parametrize('fmt', list(EXPORT_FORMATS))
+def test_empty_frame_exports(fmt, df):
+    assert isinstance(export_dataframe(df.head(0), fmt), io.BytesIO)
+
+
+def test_xlsx_writes_formulas_as_text():
+    mensaje = '=HYPERLINK("http://x","clic")'
+    df = pd.DataFrame({'Mensaje': [mensaje], 'Origen': ['+51 999'], 'Destino': ['@ana']})
+    ws = load_workbook(export_dataframe(df, 'Excel (XLSX)')).active
+    for cell, expected in zip(ws[2], [mensaje, '+51 999', '@ana']):
+        assert cell.data_type == 's'
+        assert cell.value == expected
+
+
+def test_xlsx_handles_nullable_dtypes():
+    df = pd.DataFrame({
+        'Hora': pd.array([8, None], dtype='Int64'),
+        'Mensaje': pd.array(['hola', None], dtype='string'),
+    })
+    ws = load_workbook(export_dataframe(df, 'Excel (XLSX)')).active
+    assert [c.value for c in ws[2]] == [8, 'hola']
+    assert ws.cell(row=3, column=1).value is None
+    assert ws.cell(row=3, column=2).value is None